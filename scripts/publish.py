@@ -1,19 +1,32 @@
 #!/usr/bin/env python3
 import argparse
+import functools
 import os
 import re
 import shutil
 import subprocess
 import sys
 import hashlib
+import json
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import yaml
+except ImportError:  # PyYAML is optional; the built-in front matter parser is used instead.
+    yaml = None
+if yaml is not None and not hasattr(yaml, "CSafeLoader"):
+    # Without libyaml, PyYAML's pure-Python loader is slower than the built-in parser.
+    yaml = None
 
 ROOT = Path(__file__).resolve().parents[1]
 EXPORT_ROOT = Path(os.environ.get("NOTES_EXPORT_ROOT_DIR", ROOT / ".notes-export"))
 CONTENT_DIR = ROOT / "content" / "posts"
+PUBLISH_CACHE_PATH = ROOT / ".notes-publish-cache.json"
+POST_MANIFEST_PATH = ROOT / ".notes-posts-manifest.json"
 TAG_LINE_PREFIX = "tags:"
 CONTROL_LINE_PREFIX = "control:"
 STATUS_LINE_PREFIX = "status:"
@@ -22,10 +35,43 @@ NOTE_ID_LINE_PREFIX = "note id:"
 NOTE_ID_ALT_PREFIX = "note_id:"
 MODIFIED_LINE_PREFIX = "modified:"
 LASTMOD_LINE_PREFIX = "lastmod:"
+HEADER_WINDOW = 11
+HEADER_PREFIX_LEN = max(
+    len(prefix)
+    for prefix in (
+        TAG_LINE_PREFIX,
+        CONTROL_LINE_PREFIX,
+        STATUS_LINE_PREFIX,
+        SLUG_LINE_PREFIX,
+        NOTE_ID_LINE_PREFIX,
+        NOTE_ID_ALT_PREFIX,
+        MODIFIED_LINE_PREFIX,
+        LASTMOD_LINE_PREFIX,
+    )
+)
 CONTROL_TAGS = {"blog", "publish", "published"}
 PUBLISH_TAG = "publish"
 PUBLISHED_TAG = "published"
 BLOG_FOLDER = os.environ.get("NOTES_BLOG_FOLDER", "Blog")
+EXISTING_POST_KEYS = {"note_id", "date", "lastmod"}
+
+SLUG_NONALNUM_RE = re.compile(r"[^a-z0-9]+")
+SLUG_DASHES_RE = re.compile(r"-{2,}")
+NOTE_ID_RE = re.compile(r"(.+)-([A-Za-z0-9]+)$")
+HASHTAG_RE = re.compile(r"#([A-Za-z0-9][A-Za-z0-9_-]*)")
+TOKEN_SPLIT_RE = re.compile(r"[,\s]+")
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9_-]*")
+STABLE_ID_RE = re.compile(r"([A-Za-z0-9]{6,})$")
+LINE_BREAK_RE = re.compile("[\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+FRONT_MATTER_END_RE = re.compile(r"^[ \t]*---[ \t\r]*$", re.MULTILINE)
+LINK_RE = re.compile(r'(!?\[[^\]]*\]\()([^)]+)(\))', re.ASCII)
+
+if yaml is not None:
+
+    class FrontMatterLoader(yaml.CSafeLoader):
+        # No implicit resolvers: every plain scalar stays a string, so dates
+        # round-trip into front matter exactly as written.
+        yaml_implicit_resolvers = {}
 
 
 @dataclass
@@ -36,7 +82,8 @@ class Note:
     slug_override: str | None
     body: str
     source_path: Path
-    mtime: datetime
+    mtime_ts: float
+    modified: datetime | None
     has_publish: bool
     has_published: bool
     has_native_tag_chips: bool
@@ -71,18 +118,19 @@ def run(cmd, cwd=None, check=True, env=None):
     return result
 
 
+@functools.lru_cache(maxsize=4096)
 def slugify(text: str) -> str:
     value = unicodedata.normalize("NFKD", text)
     value = value.encode("ascii", "ignore").decode("ascii")
     value = value.lower()
-    value = re.sub(r"[^a-z0-9]+", "-", value).strip("-")
-    value = re.sub(r"-{2,}", "-", value)
+    value = SLUG_NONALNUM_RE.sub("-", value).strip("-")
+    value = SLUG_DASHES_RE.sub("-", value)
     return value
 
 
 def parse_note_id(path: Path) -> str:
     stem = path.stem
-    match = re.match(r"(.+)-([A-Za-z0-9]+)$", stem)
+    match = NOTE_ID_RE.match(stem)
     if match:
         return match.group(2)
     return slugify(stem) or stem
@@ -98,7 +146,7 @@ def clean_title(line: str) -> str:
 def parse_tags(line: str) -> list:
     tag_text = line.split(":", 1)[1] if ":" in line else ""
     # Prefer explicit hashtags when present.
-    tags = re.findall(r"#([A-Za-z0-9][A-Za-z0-9_-]*)", tag_text)
+    tags = HASHTAG_RE.findall(tag_text)
     if tags:
         return list(dict.fromkeys(t.lower() for t in tags))
 
@@ -106,11 +154,11 @@ def parse_tags(line: str) -> list:
     # Tags: blog publish
     # Control: blog, publish
     words = []
-    for raw in re.split(r"[,\s]+", tag_text):
+    for raw in TOKEN_SPLIT_RE.split(tag_text):
         token = raw.strip().strip("'\"").lower().lstrip("#")
         if not token:
             continue
-        if re.fullmatch(r"[a-z0-9][a-z0-9_-]*", token):
+        if TOKEN_RE.fullmatch(token):
             words.append(token)
     return list(dict.fromkeys(words))
 
@@ -128,72 +176,72 @@ def parse_status(line: str) -> str | None:
     raw = line.split(":", 1)[1].strip().lower().lstrip("#")
     if not raw:
         return None
-    token = re.split(r"[,\s]+", raw, maxsplit=1)[0]
-    if re.fullmatch(r"[a-z0-9][a-z0-9_-]*", token):
+    token = TOKEN_SPLIT_RE.split(raw, maxsplit=1)[0]
+    if TOKEN_RE.fullmatch(token):
         return token
     return None
 
 
-def parse_note_markdown(path: Path) -> Note | None:
-    text = path.read_text(encoding="utf-8")
-    lines = text.splitlines()
-    non_empty = [i for i, line in enumerate(lines) if line.strip() != ""]
-    if not non_empty:
+def parse_note_markdown(path: Path, text: str | None = None) -> Note | None:
+    if text is None:
+        text = path.read_text(encoding="utf-8")
+    if LINE_BREAK_RE.search(text):
+        text = "\n".join(text.splitlines())
+    # Only the title and the header window after it are split into lines;
+    # the rest of the note is sliced off as the body tail.
+    title_line = None
+    window = []
+    pos = 0
+    while pos < len(text) and len(window) < HEADER_WINDOW:
+        end = text.find("\n", pos)
+        if end == -1:
+            end = len(text)
+        line = text[pos:end]
+        pos = end + 1
+        if title_line is not None:
+            window.append(line)
+        elif line.strip():
+            title_line = clean_title(line)
+    if title_line is None:
         return None
-    title_idx = non_empty[0]
-    title_line = clean_title(lines[title_idx])
-    tag_indices = []
-    slug_idx = None
-    note_id_idx = None
-    modified_idx = None
-    status_idx = None
+    head_lines = []
     tags = []
     slug_override = None
     note_id_override = None
     modified_override = None
     status_value = None
     has_native_tag_chips = False
-    for i in range(title_idx + 1, min(title_idx + 12, len(lines))):
-        stripped = lines[i].strip()
-        lower = stripped.lower()
+    for line in window:
+        stripped = line.lstrip()
+        # Only the prefix decides the header kind; avoid lowercasing the line.
+        lower = stripped[:HEADER_PREFIX_LEN].lower()
+        if ":" not in lower:
+            head_lines.append(line)
+            continue
         if lower.startswith(TAG_LINE_PREFIX):
-            tag_indices.append(i)
             tags.extend(parse_tags(stripped))
             has_native_tag_chips = "\ufffc" in stripped
-        if lower.startswith(CONTROL_LINE_PREFIX):
-            tag_indices.append(i)
+        elif lower.startswith(CONTROL_LINE_PREFIX):
             tags.extend(parse_tags(stripped))
-        if lower.startswith(STATUS_LINE_PREFIX):
-            status_idx = i
+        elif lower.startswith(STATUS_LINE_PREFIX):
             status_value = parse_status(stripped)
-        if lower.startswith(SLUG_LINE_PREFIX):
-            slug_idx = i
+        elif lower.startswith(SLUG_LINE_PREFIX):
             slug_override = parse_slug(stripped)
-        if lower.startswith(NOTE_ID_LINE_PREFIX) or lower.startswith(NOTE_ID_ALT_PREFIX):
-            note_id_idx = i
+        elif lower.startswith((NOTE_ID_LINE_PREFIX, NOTE_ID_ALT_PREFIX)):
             note_id_override = parse_slug(stripped)
-        if lower.startswith(MODIFIED_LINE_PREFIX) or lower.startswith(LASTMOD_LINE_PREFIX):
-            modified_idx = i
+        elif lower.startswith((MODIFIED_LINE_PREFIX, LASTMOD_LINE_PREFIX)):
             modified_raw = parse_slug(stripped)
             modified_override = parse_dt(modified_raw)
+        else:
+            head_lines.append(line)
     tags = list(dict.fromkeys(tags))
-    skip_indices = {title_idx}
-    for idx in tag_indices:
-        skip_indices.add(idx)
-    if slug_idx is not None:
-        skip_indices.add(slug_idx)
-    if note_id_idx is not None:
-        skip_indices.add(note_id_idx)
-    if modified_idx is not None:
-        skip_indices.add(modified_idx)
-    if status_idx is not None:
-        skip_indices.add(status_idx)
-    body_lines = [line for i, line in enumerate(lines) if i not in skip_indices]
-    while body_lines and body_lines[0].strip() == "":
-        body_lines.pop(0)
-    body = "\n".join(body_lines).strip() + "\n" if body_lines else ""
+    body = "\n".join(head_lines)
+    if pos < len(text):
+        body = body + "\n" + text[pos:]
+    body = body.strip()
+    body = body + "\n" if body else ""
     note_id = note_id_override or parse_note_id(path)
-    mtime = modified_override or datetime.fromtimestamp(path.stat().st_mtime).astimezone()
+    mtime_ts = modified_override.timestamp() if modified_override else path.stat().st_mtime
     has_publish = status_value == PUBLISH_TAG
     has_published = status_value == PUBLISHED_TAG
     return Note(
@@ -203,7 +251,8 @@ def parse_note_markdown(path: Path) -> Note | None:
         slug_override=slug_override,
         body=body,
         source_path=path,
-        mtime=mtime,
+        mtime_ts=mtime_ts,
+        modified=modified_override,
         has_publish=has_publish,
         has_published=has_published,
         has_native_tag_chips=has_native_tag_chips,
@@ -211,19 +260,39 @@ def parse_note_markdown(path: Path) -> Note | None:
     )
 
 
-def parse_front_matter(text: str) -> tuple[dict, str]:
+def parse_front_matter(text: str, keys: set | None = None) -> tuple[dict, str]:
     if not text.startswith("---\n"):
         return {}, text
-    lines = text.splitlines()
-    end_idx = None
-    for i in range(1, len(lines)):
-        if lines[i].strip() == "---":
-            end_idx = i
-            break
-    if end_idx is None:
+    end = FRONT_MATTER_END_RE.search(text, 4)
+    if end is None:
         return {}, text
-    fm_lines = lines[1:end_idx]
-    body = "\n".join(lines[end_idx + 1 :]).lstrip("\n")
+    fm_text = text[4 : end.start()]
+    body = text[end.end() + 1 :].lstrip("\n")
+    if yaml is not None:
+        try:
+            data = yaml.load(fm_text, Loader=FrontMatterLoader) or {}
+        except yaml.YAMLError:
+            data = None
+        if isinstance(data, dict):
+            return clean_front_matter(data, keys), body
+    return parse_front_matter_lines(fm_text.split("\n"), keys), body
+
+
+def clean_front_matter(data: dict, keys: set | None = None) -> dict:
+    # Match the built-in parser: string values, plus `tags` as a list of
+    # strings. Anything else (nested lists or maps) is dropped.
+    cleaned = {}
+    for key, value in data.items():
+        if keys is not None and key not in keys:
+            continue
+        if key == "tags" and isinstance(value, list):
+            cleaned[key] = [tag for tag in value if isinstance(tag, str) and tag]
+        elif isinstance(key, str) and isinstance(value, str):
+            cleaned[key] = value
+    return cleaned
+
+
+def parse_front_matter_lines(fm_lines: list, keys: set | None = None) -> dict:
     data = {}
     i = 0
     while i < len(fm_lines):
@@ -234,6 +303,9 @@ def parse_front_matter(text: str) -> tuple[dict, str]:
         key, value = line.split(":", 1)
         key = key.strip()
         value = value.strip()
+        if keys is not None and key not in keys:
+            i += 1
+            continue
         if key == "tags":
             tags = []
             if value:
@@ -248,30 +320,88 @@ def parse_front_matter(text: str) -> tuple[dict, str]:
             continue
         data[key] = value.strip("'\"")
         i += 1
-    return data, body
+    return data
+
+
+def iter_markdown_files(root: Path):
+    # Walk with os.scandir so file/dir checks reuse the readdir entry type.
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".md") and entry.is_file():
+                    yield entry.path
+
+
+def load_json_cache(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_json_cache(path: Path, data: dict):
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def scan_posts(manifest: dict) -> dict:
+    # Map slug -> front matter keys for every post bundle. Entries from the
+    # manifest are reused while the post's index.md size and mtime are
+    # unchanged, so only new or edited posts are read and parsed.
+    posts = {}
+    if not CONTENT_DIR.exists():
+        return posts
+    with os.scandir(CONTENT_DIR) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            index_path = os.path.join(entry.path, "index.md")
+            try:
+                index_stat = os.stat(index_path)
+            except FileNotFoundError:
+                continue
+            mtime_ns, size = index_stat.st_mtime_ns, index_stat.st_size
+            cached = manifest.get(entry.name)
+            if isinstance(cached, dict) and (cached.get("mtime_ns"), cached.get("size")) == (mtime_ns, size):
+                posts[entry.name] = cached
+                continue
+            fm, _ = parse_front_matter(Path(index_path).read_text(encoding="utf-8"), EXISTING_POST_KEYS)
+            posts[entry.name] = {key: fm.get(key) for key in EXISTING_POST_KEYS}
+            posts[entry.name]["mtime_ns"] = mtime_ns
+            posts[entry.name]["size"] = size
+    return posts
 
 
 def load_existing_posts() -> dict:
     mapping = {}
-    if not CONTENT_DIR.exists():
-        return mapping
-    for index in CONTENT_DIR.glob("*/index.md"):
-        fm, _ = parse_front_matter(index.read_text(encoding="utf-8"))
+    for slug, fm in scan_posts(load_json_cache(POST_MANIFEST_PATH)).items():
         note_id = fm.get("note_id")
         if note_id:
             mapping[note_id] = {
-                "slug": index.parent.name,
+                "slug": slug,
                 "date": fm.get("date"),
                 "lastmod": fm.get("lastmod"),
             }
     return mapping
 
 
-def ensure_unique_slug(slug: str, note_id: str) -> str:
+def save_post_manifest():
+    save_json_cache(POST_MANIFEST_PATH, scan_posts(load_json_cache(POST_MANIFEST_PATH)))
+
+
+def ensure_unique_slug(slug: str, note_id: str, claimed: dict | None = None) -> str:
+    # `claimed` maps slugs already assigned in this run to their note ids.
+    if claimed is not None:
+        owner = claimed.get(slug)
+        if owner and owner != note_id:
+            return f"{slug}-{note_id[:6]}"
     index_path = CONTENT_DIR / slug / "index.md"
     if not index_path.exists():
         return slug
-    fm, _ = parse_front_matter(index_path.read_text(encoding="utf-8"))
+    fm, _ = parse_front_matter(index_path.read_text(encoding="utf-8"), {"note_id"})
     existing_note_id = fm.get("note_id")
     if existing_note_id and existing_note_id != note_id:
         return f"{slug}-{note_id[:6]}"
@@ -283,7 +413,7 @@ def format_dt(dt: datetime) -> str:
 
 
 def parse_dt(value: str | None) -> datetime | None:
-    if not value:
+    if not value or not isinstance(value, str):
         return None
     try:
         return datetime.fromisoformat(value)
@@ -318,45 +448,97 @@ def split_link_target(raw: str) -> tuple[str, str]:
     return raw, ""
 
 
+def list_entries(directory: Path) -> dict:
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name: entry for entry in entries}
+    except FileNotFoundError:
+        return {}
+
+
+@functools.lru_cache(maxsize=None)
+def list_files(directory: Path) -> dict:
+    # Cached for the whole run: exports are flat, so many notes share one
+    # directory and it never changes while publishing.
+    with os.scandir(directory) as entries:
+        return {entry.name: entry.path for entry in entries if entry.is_file()}
+
+
 def rewrite_links(body: str, md_dir: Path, bundle_dir: Path) -> tuple[str, list]:
     attachments = []
     attachments_dir = bundle_dir / "attachments"
 
     def replace(match):
-        target = match.group(2)
+        pre, target, post = match.groups()
         path, tail = split_link_target(target)
         if not is_local_link(path):
             return match.group(0)
         if path.startswith("/"):
             return match.group(0)
-        source_path = (md_dir / path).resolve()
-        if not source_path.exists():
-            return match.group(0)
-        new_name = source_path.name
+        sibling = None
+        if "/" not in path:
+            # Most attachments sit next to the note; look them up in the
+            # directory listing instead of statting every link target.
+            sibling = list_files(md_dir).get(path)
+        if sibling:
+            source_path = Path(sibling)
+        else:
+            # A lexical join is enough to read the file; no need to resolve.
+            source_path = md_dir / path
+            if not source_path.is_file():
+                return match.group(0)
+        new_name = os.path.basename(path)
         attachments.append((source_path, attachments_dir / new_name))
         new_target = f"attachments/{new_name}{tail}"
-        return f"{match.group(1)}{new_target}{match.group(3)}"
+        return f"{pre}{new_target}{post}"
 
-    pattern = re.compile(r'(!?\[[^\]]*\]\()([^)]+)(\))')
-    updated = pattern.sub(replace, body)
+    updated = LINK_RE.sub(replace, body)
     return updated, attachments
 
 
+def sync_attachments(attachments_dir: Path, attachments: list) -> bool:
+    # Copy only attachments that are missing or whose source differs in size
+    # or mtime, and drop ones the post no longer links. Returns whether the
+    # directory changed.
+    wanted = {dest.name: source for source, dest in attachments}
+    current = list_entries(attachments_dir)
+    if not wanted:
+        if current:
+            shutil.rmtree(attachments_dir)
+        return bool(current)
+    attachments_dir.mkdir(parents=True, exist_ok=True)
+    changed = False
+    for name, entry in current.items():
+        if name in wanted and entry.is_file(follow_symlinks=False):
+            source_stat = wanted[name].stat()
+            dest_stat = entry.stat(follow_symlinks=False)
+            if (source_stat.st_size, source_stat.st_mtime_ns) == (dest_stat.st_size, dest_stat.st_mtime_ns):
+                del wanted[name]
+                continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path)
+        else:
+            os.unlink(entry.path)
+        changed = True
+    for name, source in wanted.items():
+        # Always a real copy: a hardlink would share the source's inode, so
+        # in-place edits to the export would bypass the size/mtime check.
+        shutil.copy2(source, attachments_dir / name)
+        changed = True
+    return changed
+
+
 def write_post(note: Note, slug: str, existing: dict | None) -> tuple[Path, bool]:
     bundle_dir = CONTENT_DIR / slug
     bundle_dir.mkdir(parents=True, exist_ok=True)
-    attachments_dir = bundle_dir / "attachments"
-    if attachments_dir.exists():
-        shutil.rmtree(attachments_dir)
     body, attachments = rewrite_links(note.body, note.source_path.parent, bundle_dir)
-    for source, dest in attachments:
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(source, dest)
+    attachments_changed = sync_attachments(bundle_dir / "attachments", attachments)
 
+    mtime = note.modified or datetime.fromtimestamp(note.mtime_ts).astimezone()
     publish_date = existing.get("date") if existing else None
     if not publish_date:
-        publish_date = format_dt(note.mtime)
-    lastmod = format_dt(note.mtime)
+        publish_date = format_dt(mtime)
+    lastmod = format_dt(mtime)
     tags = [t for t in note.tags if t not in CONTROL_TAGS]
 
     front_matter = ["---"]
@@ -372,14 +554,21 @@ def write_post(note: Note, slug: str, existing: dict | None) -> tuple[Path, bool
     content = "\n".join(front_matter) + "\n\n" + body.strip() + "\n"
 
     index_path = bundle_dir / "index.md"
-    previous = index_path.read_text(encoding="utf-8") if index_path.exists() else None
-    index_path.write_text(content, encoding="utf-8")
-    changed = previous != content
-    return index_path, changed
+    new_bytes = content.encode("utf-8")
+    changed = True
+    try:
+        # Only read the old post back when its size could make it identical.
+        if index_path.stat().st_size == len(new_bytes):
+            changed = index_path.read_bytes() != new_bytes
+    except FileNotFoundError:
+        pass
+    if changed:
+        index_path.write_bytes(new_bytes)
+    return index_path, changed or attachments_changed
 
 
 def stable_note_id(raw_id: str) -> str:
-    match = re.search(r"([A-Za-z0-9]{6,})$", raw_id or "")
+    match = STABLE_ID_RE.search(raw_id or "")
     if match:
         return match.group(1)
     digest = hashlib.sha1((raw_id or "").encode("utf-8")).hexdigest()
@@ -453,9 +642,11 @@ end run
 
 
 def ensure_export():
-    if EXPORT_ROOT.exists():
+    try:
         shutil.rmtree(EXPORT_ROOT)
-    EXPORT_ROOT.mkdir(parents=True, exist_ok=True)
+    except FileNotFoundError:
+        pass
+    EXPORT_ROOT.mkdir(parents=True)
     export_matching_notes()
 
 
@@ -464,47 +655,47 @@ def update_notes_to_published(titles: list[str]):
         return
     script = r"""
 on run argv
-  set targetTitles to argv
+  set recordSep to character id 30
+  set payload to read (POSIX file "/dev/stdin") as «class utf8»
+  set AppleScript's text item delimiters to recordSep
+  set targetTitles to text items of payload
+  set AppleScript's text item delimiters to ""
   set updatedCount to 0
   tell application "Notes"
-    repeat with acc in accounts
-      repeat with fold in folders of acc
-        repeat with n in notes of fold
-          set noteName to name of n
-          if targetTitles contains noteName then
-            set noteBody to body of n
-            if noteBody contains "Status: publish" then
-              set body of n to my replace_text(noteBody, "Status: publish", "Status: published")
-              set updatedCount to updatedCount + 1
-            end if
-          end if
-        end repeat
+    repeat with targetTitle in targetTitles
+      repeat with n in (every note whose name is (targetTitle as string))
+        set noteBody to body of n
+        if noteBody contains "Status: publish" then
+          set body of n to my replace_once(noteBody, "Status: publish", "Status: published")
+          set updatedCount to updatedCount + 1
+        end if
       end repeat
     end repeat
   end tell
   return updatedCount
 end run
 
-on replace_text(theText, searchString, replaceString)
-  set AppleScript's text item delimiters to searchString
-  set theItems to every text item of theText
-  set AppleScript's text item delimiters to replaceString
-  set theText to theItems as string
-  set AppleScript's text item delimiters to ""
-  return theText
-end replace_text
+on replace_once(theText, searchString, replaceString)
+  set matchStart to offset of searchString in theText
+  if matchStart is 0 then return theText
+  set prefix to ""
+  if matchStart > 1 then set prefix to text 1 thru (matchStart - 1) of theText
+  set suffix to ""
+  set tailStart to matchStart + (length of searchString)
+  if tailStart <= (length of theText) then set suffix to text tailStart thru -1 of theText
+  return prefix & replaceString & suffix
+end replace_once
 """
-    with subprocess.Popen(
-        ["osascript", "-"] + titles,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+    # Titles go over stdin so large batches are not limited by ARG_MAX.
+    proc = subprocess.run(
+        ["osascript", "-e", script],
+        input="\x1e".join(titles),
+        capture_output=True,
         text=True,
-    ) as proc:
-        stdout, stderr = proc.communicate(script)
-        if proc.returncode != 0:
-            sys.stderr.write(stderr or stdout)
-            raise SystemExit(proc.returncode)
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr or proc.stdout)
+        raise SystemExit(proc.returncode)
 
 
 def git(cmd):
@@ -567,7 +758,8 @@ def main():
         ensure_export()
 
     existing = load_existing_posts()
-    markdown_files = list(EXPORT_ROOT.rglob("*.md"))
+    publish_cache = load_json_cache(PUBLISH_CACHE_PATH)
+    markdown_files = list(iter_markdown_files(EXPORT_ROOT))
     if not markdown_files:
         print("No exported markdown files found.")
         return
@@ -577,9 +769,16 @@ def main():
     skipped = 0
     plan_items = []
     skipped_items = []
-
-    for md_path in markdown_files:
-        note = parse_note_markdown(md_path)
+    claimed_slugs = {}
+    candidates = {}
+    pending_writes = []
+    content_changed = False
+
+    for md_file in markdown_files:
+        md_path = Path(md_file)
+        raw = md_path.read_bytes()
+        source_hash = hashlib.sha256(raw).hexdigest()
+        note = parse_note_markdown(md_path, raw.decode("utf-8"))
         if not note:
             continue
         existing_info = existing.get(note.note_id)
@@ -612,7 +811,9 @@ def main():
 
         existing_lastmod = parse_dt(existing_info.get("lastmod")) if existing_info else None
         if has_published and not has_publish and existing_lastmod:
-            if note.mtime <= existing_lastmod:
+            # lastmod is stored at second precision; compare timestamps so
+            # naive and offset-aware values never mix.
+            if int(note.mtime_ts) <= existing_lastmod.timestamp():
                 skipped += 1
                 if args.dry_run:
                     skipped_items.append(
@@ -633,7 +834,8 @@ def main():
             slug = slugify(note.title)
         if not slug:
             slug = note.note_id
-        slug = ensure_unique_slug(slug, note.note_id)
+        slug = ensure_unique_slug(slug, note.note_id, claimed_slugs)
+        claimed_slugs[slug] = note.note_id
         rename_from_slug = None
         if existing_info and note.slug_override and slug != existing_info.get("slug"):
             rename_from_slug = existing_info.get("slug")
@@ -655,36 +857,81 @@ def main():
         if args.dry_run:
             continue
 
+        candidates[note.note_id] = (note, slug, existing_info, source_hash, rename_from_slug)
+
+    if args.dry_run:
+        describe_plan(plan_items, skipped_items)
+        return
+
+    # Several export files can share a note id; only the last one seen is
+    # published, and only it is compared against the cache, so the post does
+    # not flip between them from run to run.
+    for note, slug, existing_info, source_hash, rename_from_slug in candidates.values():
         if rename_from_slug:
             old_dir = CONTENT_DIR / rename_from_slug
             new_dir = CONTENT_DIR / slug
             if old_dir.exists() and not new_dir.exists():
                 old_dir.rename(new_dir)
+                content_changed = True
+
+        bundle_dir = CONTENT_DIR / slug
+        if publish_cache.get(note.note_id) == source_hash and (bundle_dir / "index.md").exists():
+            # Source is byte-identical to the last publish, so index.md is
+            # current as long as the same links still resolve to attachments.
+            _, attachments = rewrite_links(note.body, note.source_path.parent, bundle_dir)
+            attachments_dir = bundle_dir / "attachments"
+            if {dest.name for _, dest in attachments} == set(list_entries(attachments_dir)):
+                if sync_attachments(attachments_dir, attachments):
+                    content_changed = True
+                    written += 1
+                else:
+                    skipped += 1
+                if note.has_publish:
+                    updated_titles.append(note.title)
+                continue
 
-        _, changed = write_post(note, slug, existing_info)
+        pending_writes.append((note, slug, existing_info, source_hash))
+
+    # Slugs are resolved above; rendering posts and copying attachments is
+    # I/O-bound and independent per post, so fan it out.
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda item: write_post(*item[:3]), pending_writes))
+    for (note, _, _, source_hash), (_, changed) in zip(pending_writes, results):
+        publish_cache[note.note_id] = source_hash
+        content_changed = content_changed or changed
         written += 1
-        if has_publish:
+        if note.has_publish:
             updated_titles.append(note.title)
 
-    if args.dry_run:
-        describe_plan(plan_items, skipped_items)
-        return
+    save_post_manifest()
 
-    if written == 0:
+    if written == 0 and not updated_titles:
         if skipped:
             print(f"No posts required publishing. skipped: {skipped}")
             return
         print("No matching notes found with Status: publish/published.")
         return
 
-    git(["add", str(CONTENT_DIR)])
-    diff_check = git(["diff", "--cached", "--quiet"])
-    if diff_check.returncode != 0:
-        git(["commit", "-m", f"Publish {written} posts"])
-        push = git(["push"])
-        if push.returncode != 0:
-            sys.stderr.write("Git push failed. Notes not updated.\n")
-            raise SystemExit(push.returncode)
+    if not content_changed:
+        # Leftovers from a run whose commit or push failed still need publishing.
+        status = git(["status", "--porcelain", "--", str(CONTENT_DIR)])
+        content_changed = bool(status.stdout.strip())
+    if content_changed:
+        git(["add", str(CONTENT_DIR)])
+        diff_check = git(["diff", "--cached", "--quiet", "--", str(CONTENT_DIR)])
+        if diff_check.returncode != 0:
+            commit = git(["commit", "-m", f"Publish {written} posts", "--", str(CONTENT_DIR)])
+            if commit.returncode != 0:
+                sys.stderr.write(commit.stderr or commit.stdout)
+                sys.stderr.write("Git commit failed. Notes not updated.\n")
+                raise SystemExit(commit.returncode)
+            push = git(["push"])
+            if push.returncode != 0:
+                sys.stderr.write("Git push failed. Notes not updated.\n")
+                raise SystemExit(push.returncode)
+    # Only remember published sources once they are committed and pushed.
+    save_json_cache(PUBLISH_CACHE_PATH, publish_cache)
     should_update_notes = not args.skip_notes_update and not args.skip_export
     if should_update_notes:
         update_notes_to_published(updated_titles)